@@ -1,108 +1,264 @@
-import pandas as pd # I use the pandas dataframe library as a convenient way to index the board
-from itertools import product as prod # itertools.product is a nice way to nest for loops
-import math
+import numpy as np # I use numpy arrays to store the board since every cell just holds small numbers
+try:
+    from numba import njit # numba compiles the checking loops to machine code
+except ImportError:
+    def njit(*args, **kwargs): # without numba the checks still work, just as normal python
+        return lambda f: f
 
+'''
+Every board has the same rows, columns, and boxes, so the cells in each
+of them (UNITS) and the 20 cells that each cell hits (PEERS) are worked
+out once when the program starts instead of by every board
+'''
+ROW_OF = np.arange(81) // 9
+COL_OF = np.arange(81) % 9
+BOX_OF = (ROW_OF // 3) * 3 + COL_OF // 3
+# the row, column and box of each cell, counting from 0
+
+UNITS = np.array([np.flatnonzero(of == n) for of in (ROW_OF,COL_OF,BOX_OF) for n in range(9)], dtype=np.int8)
+# rows are UNITS[0:9], columns are UNITS[9:18] and boxes are UNITS[18:27]
+
+UNITS_OF = np.stack([ROW_OF, 9 + COL_OF, 18 + BOX_OF], axis=1)
+# the 3 units (row, column and box) that each cell is in
+
+PEERS = np.zeros((81,20), dtype=np.int8)
+for i in range(81):
+    hit = (ROW_OF == ROW_OF[i]) | (COL_OF == COL_OF[i]) | (BOX_OF == BOX_OF[i])
+    hit[i] = False
+    PEERS[i] = np.flatnonzero(hit)
+
+UNITS.setflags(write=False)
+UNITS_OF.setflags(write=False)
+PEERS.setflags(write=False)
+# the tables are shared by every board, so make sure nothing changes them
+
+POPCNT = np.array([bin(m).count('1') for m in range(512)], dtype=np.uint8)
+# POPCNT[m] is how many possibilities are left in the bitmask m
+
+
+'''
+The checks themselves are plain loops over the candidate bitmasks
+so that numba can compile them. Each one changes cand in place
+and returns 1 if it changed anything, 0 if it didn't, or CONTRADICTION
+as soon as it finds that the board can't be solved. counts[u,n-1] is
+how many cells of unit u could still be n; every possibility is taken
+out through eliminate so the counts never have to be worked out again.
+When a count drops to 1, eliminate puts u*9+n-1 on the queue
+(queue_len[0] is how much of it is in use) so that group_kernel
+only has to look at those units instead of all of them
+'''
+CONTRADICTION = -1
+
+@njit(cache=True, boundscheck=False)
+def eliminate(cand, counts, queue, queue_len, i, bits):
+    '''
+    take the possibilities in bits out of cell i and update
+    the counts of its 3 units, queueing any number that now
+    only has one place left in a unit. Returns False if that
+    leaves a number with nowhere to go in one of them
+    '''
+    gone = cand[i] & bits
+    cand[i] ^= gone
+    ok = True
+    for n in range(9):
+        if gone & (1 << n):
+            for u in UNITS_OF[i]:
+                counts[u,n] -= 1
+                if counts[u,n] == 1:
+                    queue[queue_len[0]] = u * 9 + n
+                    queue_len[0] += 1
+                elif counts[u,n] == 0:
+                    ok = False
+    return ok
+
+@njit(cache=True, boundscheck=False)
+def simple_kernel(cand, counts, queue, queue_len, unchecked, peers):
+    changed = 0
+    for i in range(81):
+        m = cand[i]
+        if unchecked[i] and m != 0 and (m & (m - 1)) == 0:
+            for p in peers[i]:
+                if cand[p] & m:
+                    if not eliminate(cand, counts, queue, queue_len, p, m) or cand[p] == 0:
+                        return CONTRADICTION
+                    changed = 1
+            unchecked[i] = False
+    return changed
+
+@njit(cache=True, boundscheck=False)
+def group_kernel(cand, counts, queue, queue_len, units):
+    changed = 0
+    while queue_len[0] > 0:
+        queue_len[0] -= 1
+        u, n = divmod(queue[queue_len[0]], 9)
+        if counts[u,n] == 0: # nowhere left in the unit for the number
+            return CONTRADICTION
+        b = 1 << n
+        for i in units[u]:
+            if cand[i] & b:
+                if cand[i] != b:
+                    if not eliminate(cand, counts, queue, queue_len, i, cand[i] ^ b):
+                        return CONTRADICTION
+                    changed = 1
+                break
+    return changed
+
+@njit(cache=True, boundscheck=False)
+def pair_kernel(cand, counts, queue, queue_len, units):
+    changed = 0
+    for u in range(units.shape[0]):
+        unit = units[u]
+        for j in unit: # naked pairs and triples
+            m = cand[j]
+            k = POPCNT[m]
+            if k == 2 or k == 3:
+                inside = 0
+                for i in unit:
+                    if (cand[i] & ~m) == 0:
+                        inside += 1
+                if inside > k: # more cells than numbers to fill them with
+                    return CONTRADICTION
+                if inside == k:
+                    for i in unit:
+                        if (cand[i] & ~m) != 0 and (cand[i] & m) != 0:
+                            if not eliminate(cand, counts, queue, queue_len, i, cand[i] & m):
+                                return CONTRADICTION
+                            changed = 1
+        for a in range(9): # hidden pairs
+            for b in range(a + 1, 9):
+                ab = (1 << a) | (1 << b)
+                count = 0
+                for i in unit:
+                    if cand[i] & ab:
+                        count += 1
+                if count == 2:
+                    for i in unit:
+                        if (cand[i] & ab) != 0 and (cand[i] | ab) != ab:
+                            if not eliminate(cand, counts, queue, queue_len, i, (cand[i] | ab) ^ ab):
+                                return CONTRADICTION
+                            changed = 1
+    return changed
+
+def is_board(text): # whether text is a board setup: exactly 81 digits
+    return len(text) == 81 and text.isascii() and text.isdigit()
+
+def read_boards(texts):
+    '''
+    turn a list of strings of 81 digits (0 is empty)
+    into an (N,81) array of candidate bitmasks. Every
+    string has to pass is_board first, otherwise one
+    board would run into the next one
+    '''
+    digits = np.frombuffer(''.join(texts).encode(), dtype=np.uint8).reshape(-1,81).astype(np.int16) - ord('0')
+    return np.where(digits > 0, 1 << (digits - 1).clip(0), 0x1FF).astype(np.uint16)
 
-class Cell: # the cell class is a class for each of the cells in the grid
-    def __init__(self):
-        '''
-        cells are defined with a list of all of the
-        possibilities that they could be. If a cell is 
-        filled in, the list will only include one number
-        '''
-        self.cell = list(range(1,10))
-        self.r = None
-        self.c = None
-        self.box = None
-        self.unchecked = True
-    
-    @property
-    def filled(self): # whether a cell has been completed or not
-        return len(self.cell) == 1
-    
-    def remove(self,val): # remove a value from the possibilities of a cell
-        self.cell.remove(val)
-        
-    def __len__(self): 
-        return len(self.cell)
-    
-    def __repr__(self): # representation of the cell's contents-- useful in troubleshooting
-        return f'r{self.r}c{self.c}: {self.cell}'
-    
-    def __str__(self): # representation of a cell seen in the final printed product
-        return str(self.cell[0]) if self.filled else ''
 
 class Board: # class for the puzzle's board
+    '''
+    the board is stored as one flat numpy array per cell attribute, indexed by (r-1)*9+(c-1)
+    (the row, column and box of a cell are in ROW_OF, COL_OF and BOX_OF)
+    values holds the number in each filled in cell (0 if it isn't filled in yet)
+    cand holds the possibilities of each cell as a bitmask: bit n-1 is set if the cell could be n
+    unchecked is whether each filled in cell still has to be checked by simple_check
+    filled_mask is which cells were filled in the last time the values were updated
+    counts[u,n-1] is how many cells in unit u (see UNITS) could still be n
+    queue holds u*9+n-1 for every count that has dropped to 1 but hasn't been
+    looked at by group_check yet, and queue_len[0] is how many of those there are
+    '''
+    arrays = (('values', (81,), np.uint8, 0), ('cand', (81,), np.uint16, 0x1FF), ('unchecked', (81,), bool, True),
+              ('filled_mask', (81,), bool, False), ('counts', (27,9), np.int8, 9),
+              ('queue', (243,), np.int16, 0), ('queue_len', (1,), np.int16, 0))
+    # the (name, shape, dtype, starting value) of each of those arrays
+
     def __init__(self):
-        self.board = pd.DataFrame({int(x): [Cell() for _ in range(9)] for x in range(1,10)},index=list(range(1,10)))
-        # the cells in the board are stored in a dataframe because standard sudoku indexing is like a dataframe (row, col)
-        self.cells = sum(self.board.values.tolist(),[])
-        # store cells as a list as well because you can't easily iterate through a dataframe
-        
-        '''
-        The initialization of the board gives each cell a row, column, and box
-        '''
-        boxes_dict = {(1,1) : 1, (1,2) : 2, (1,3) : 3, (2,1) : 4, (2,2) : 5, (2,3) : 6, (3,1) : 7, (3,2) : 8, (3,3) : 9}
-        for r,c in prod(range(1,10),range(1,10)):
-            cell = self[r,c]
-            cell.r = r
-            cell.c = c
-            cell.box = boxes_dict[(math.ceil(cell.r/3),math.ceil(cell.c/3))]
-            
-            
-        self.rows = {n : [cell for cell in self.cells if cell.r == n] for n in range(1,10)}
-        self.cols = {n : [cell for cell in self.cells if cell.c == n] for n in range(1,10)}
-        self.boxes = {n : [cell for cell in self.cells if cell.box == n] for n in range(1,10)}
-        
-    def hits(self,cell):
-        '''
-        function that returns a list of all of the
+        for name,shape,dtype,start in self.arrays:
+            setattr(self, name, np.full(shape, start, dtype=dtype))
+
+    def hits(self,i):
+        '''
+        function that returns an array of all of the
         other cells that a cell touches by sudoku -
-        everything in its row, column, and box
+        everything in its row, column, and box. This is
+        a read-only view of PEERS, so nothing is built
         '''
-        hits = list(set(self.rows[cell.r]+self.cols[cell.c] + self.boxes[cell.box]))
-        hits.remove(cell)
-        return hits
-    
+        return PEERS[i]
+
+    @property
+    def filled(self): # whether each cell has been completed (only one bit left) or not
+        return (self.cand != 0) & ((self.cand & (self.cand - 1)) == 0)
+
     @property
-    def filled_cells(self): # all of the filled in cells on the grid for iterating
-        return [cell for cell in self.cells if cell.filled]
-    
+    def filled_cells(self): # indices of all of the filled in cells on the grid for iterating
+        return np.flatnonzero(self.filled)
+
+    def update_values(self):
+        '''
+        copy the number of every cell that has been
+        filled in since the last update into self.values
+        '''
+        cur = self.filled
+        for i in np.flatnonzero(cur & ~self.filled_mask): # only the cells filled in since then
+            self.values[i] = int(self.cand[i]).bit_length()
+        self.filled_mask[:] = cur
+
     def simple_check(self):
         '''
         This function iterates through each completed cell that hasn't been already
         checked and removes the number in it from the possibilities in all of the
-        cells it hits (see Board.hit method)
-        '''
-        for cell in self.filled_cells:
-            if cell.unchecked:
-                for hit in self.hits(cell):
-                    if cell.cell[0] in hit.cell:
-                        hit.cell.remove(cell.cell[0])
-                cell.unchecked = False
-                
+        cells it hits (see Board.hits method). Returns 1 if anything changed, 0 if not,
+        or CONTRADICTION
+        '''
+        changed = simple_kernel(self.cand, self.counts, self.queue, self.queue_len, self.unchecked, PEERS)
+        self.update_values()
+        return changed
+
     def group_check(self):
         '''
-        iterates through every row, column and box
-        for each one, checks each number, and if only
-        one cell in the box could have that number,
-        then it must be that number
-        '''
-        for lis in [self.rows,self.cols,self.boxes]:
-            for box,n in prod(lis.values(),range(1,10)):
-                x = [cell for cell in box if n in cell.cell]
-                if len(x) == 1: x[0].cell = [n]
-    
-    def solved(self): # check to see if the board is completed
-        return [cell for cell in self.cells if cell.filled] == self.cells
-    
-    def __getitem__(self,key): 
+        goes through every number that has been queued
+        because only one cell in its row, column or box
+        could have it, and makes that cell that number.
+        Returns 1 if anything changed, 0 if not, or
+        CONTRADICTION
+        '''
+        changed = group_kernel(self.cand, self.counts, self.queue, self.queue_len, UNITS)
+        self.update_values()
+        return changed
+
+    def pair_check(self):
+        '''
+        naked pairs/triples: if k cells in a row, column or box
+        can only be the same k numbers, no other cell in it can
+        be any of them. hidden pairs: if two numbers can only go
+        in the same two cells of a unit, those cells can't be
+        anything else. Returns 1 if anything changed,
+        0 if not, or CONTRADICTION
+        '''
+        changed = pair_kernel(self.cand, self.counts, self.queue, self.queue_len, UNITS)
+        self.update_values()
+        return changed
+
+    def solved(self): # check to see if the board is completed (every cell has a value)
+        return bool(self.values.all())
+
+    def most_constrained(self):
+        '''
+        index of the unfilled cell with the fewest possibilities
+        left (the minimum remaining values heuristic), which is
+        the best cell to guess in because it has the fewest
+        wrong guesses to try
+        '''
+        sizes = POPCNT[self.cand]
+        return int(np.where(sizes <= 1, 255, sizes).argmin())
+
+    def __getitem__(self,key):
         '''
         method of indexing in the form of row,column
-        e.g. board[1,1] is the top left cell on the grid
+        e.g. board[1,1] is the number in the top left
+        cell on the grid (0 if it isn't filled in)
         '''
-        return self.board.at[key]
-    
+        r,c = key
+        return self.values[(r-1)*9+(c-1)]
+
     def __repr__(self):
         '''
         ascii representation of the board to
@@ -113,12 +269,9 @@ class Board: # class for the puzzle's board
             if r == 4 or r == 7:
                 text += '------+-------+------\n'
             for i,c in enumerate(range(1,10)):
-                cell = self[r,c]
-                if cell.filled:
-                    '''if cell in board.hits(board[1,6]):
-                        text += 'X'
-                    else:'''
-                    text += f'{cell.cell[0]}'
+                value = self[r,c]
+                if value:
+                    text += f'{value}'
                 else:
                     text += '·'
                 if i == 8:
@@ -128,104 +281,185 @@ class Board: # class for the puzzle's board
                 if i == 2 or i == 5:
                     text += '| '
         return text
-    
+
     def __setitem__(self, cell: tuple, value: list):
         '''
-        __setitem__ to set a value in the board after
-        indexing it in the same way as __getitem__ 
+        __setitem__ to set the possibilities of a cell
+        after indexing it in the same way as __getitem__
         '''
-        self.board.at[cell].cell = value
-        
+        r,c = cell
+        i = (r-1)*9+(c-1)
+        self.cand[i] = sum(1 << (v-1) for v in value)
+        self.values[i] = value[0] if len(value) == 1 else 0
+        self.filled_mask[i] = len(value) == 1
+        self.count_units()
+
     @property
-    def setup_string(self): 
+    def setup_string(self):
         '''
         return the string that would be inputted to make the board
         '''
-        return "".join([str(cell.cell[0]) if cell.filled else "0" for cell in self.cells])
-        
+        return "".join([str(value) for value in self.values])
+
     def setup(self,text):
         '''
         setup the board when given a string of 81 digits (0 is empty)
         '''
-        for fill,cell in zip(text,[self[x,y] for x,y in prod(range(1,10),range(1,10))]):
-            if int(fill):
-                cell.cell = [int(fill)]
-        
-board = Board()
-# make the game board
+        if not is_board(text):
+            raise ValueError(f'{text!r} is not a board of 81 digits')
+        self.load(read_boards([text])[0])
+
+    def load(self,cand):
+        '''
+        setup the board from an array of 81 candidate bitmasks
+        '''
+        self.cand[:] = cand
+        self.values[:] = 0
+        self.filled_mask[:] = False
+        self.unchecked[:] = True
+        self.update_values()
+        self.count_units()
+
+    def count_units(self):
+        '''
+        work out counts from scratch and queue every number
+        with one place (or none) left in a unit. After this the
+        checks keep both up to date as they take possibilities out
+        '''
+        self.counts[:] = ((self.cand[UNITS][:,:,None] >> np.arange(9)) & 1).sum(axis=1)
+        singles = np.flatnonzero(self.counts.ravel() <= 1)
+        self.queue[:len(singles)] = singles
+        self.queue_len[0] = len(singles)
 
 # these are some board setups i used in the testing process
 text = '310004069000000200008005040000000005006000017807030000590700006600003050000100002'
 tetx = '305006000700050430000400020003008007680040100050000803400005300500209004162000008'
 simple_test =  '123456780' + '0' * 72
 
-board.setup(input('board: ')) # let user input a string of numbers to make the board
-
-
-print(board) # display the initial board setup
-
 
+def batch_checks(cand):
+    '''
+    the simple and group checks applied to a whole (N,81)
+    array of boards at once, over and over again until
+    they stop making changes. Boards drop out of the
+    passes once they are solved, stuck, or contradict
+    themselves. Returns which boards could still be solved
+    '''
+    bits = np.uint16(1) << np.arange(9, dtype=np.uint16)
+    possible = np.ones(len(cand), dtype=bool)
+    active = np.arange(len(cand))
+    while len(active):
+        c = cand[active]
+        old = c.copy()
+        singles = np.where((c & (c - 1)) == 0, c, 0)
+        for k in range(20): # take the numbers of filled in cells out of the cells they hit
+            c &= ~singles[:,PEERS[:,k]]
+        ok = (c != 0).all(axis=1)
+        for b in bits: # fill in numbers that only have one place left in a unit
+            has = (c[:,UNITS] & b) != 0
+            counts = has.sum(axis=2)
+            ok &= (counts != 0).all(axis=1)
+            only = has & (counts == 1)[:,:,None]
+            forced = np.zeros(c.shape, dtype=bool)
+            for part in range(3): # rows, columns, and boxes each cover every cell once
+                units = slice(9*part,9*part+9)
+                forced[:,UNITS[units].ravel()] |= only[:,units].reshape(len(c),81)
+            c[forced] = b
+        cand[active] = c
+        possible[active] = ok
+        solved = ((c & (c - 1)) == 0).all(axis=1)
+        active = active[ok & ~solved & (c != old).any(axis=1)]
+    return possible
 
 
 def basic_checks(board):
     '''
-    combines both methods of checking
+    combines all of the methods of checking
     applies them over and over again
-    until the function stops making 
-    changes
+    until the function stops making
+    changes. Returns False as soon as one
+    of them finds a contradiction
     '''
     while True:
-        prev_board = str(board.cells)
-        while True:
-            prev = str(board.cells)
-            board.simple_check()
-            if prev == str(board.cells): break
-        while True:
-            prev = str(board.cells)
-            board.group_check()
-            if prev == str(board.cells): break
-        if prev_board == str(board.cells): break
-
-def simple_brute_check(board):
-    '''
-    iterates through each cell in the 
-    board with only two possibilities
-    left. Try filling it in with one
-    of the possibilities on a new
-    board and apply the basic checks
-    '''
-    almost = [cell for cell in board.cells if len(cell) == 2]
-    for cell in almost:
-        try:
-            new = Board()
-            new.setup(board.setup_string)
-            basic_checks(new)
-            new[cell.r,cell.c] = [cell.cell[0]]
-            basic_checks(new)
-            print(f"no contradiction at r{cell.r}c{cell.c}")
-        except IndexError:
-            print("found contradiction")
-            cell.cell = [cell.cell[1]]
-            print(f"changed r{cell.r}c{cell.c}")
-
-
-def solve():
-    '''
-    Use basic check and brute check
-    over and over again until either
-    the board is solved or it stops
-    making changes (if it gets stuck)
+        c1 = board.simple_check()
+        if c1 == CONTRADICTION: return False
+        c2 = board.group_check()
+        if c2 == CONTRADICTION: return False
+        c3 = board.pair_check()
+        if c3 == CONTRADICTION: return False
+        if not (c1 or c2 or c3): return True
+
+MAX_DEPTH = 81
+# every guess fills in another cell, so search can never go deeper than this
+STACK = {name: np.empty((MAX_DEPTH,) + shape, dtype=dtype) for name,shape,dtype,start in Board.arrays}
+# one row per depth of the search for each of the board's arrays, allocated once
+
+def save(board,depth): # copy the board's arrays into the stack at depth
+    for name,rows in STACK.items():
+        np.copyto(rows[depth], getattr(board,name))
+
+def restore(board,depth): # put the board back the way it was saved at depth
+    for name,rows in STACK.items():
+        np.copyto(getattr(board,name), rows[depth])
+
+def search(board,depth=0):
     '''
-    while True:
-        prev = str(board.cells)
-        basic_checks(board)
-        if board.solved():
-            print("Solved!")
-            print(board)
-            break
+    depth first search: apply the basic checks, and if
+    the board still isn't solved, try each possibility
+    of the cell with the fewest possibilities left,
+    putting the board back the way it was (see save
+    and restore) whenever a guess leads to a
+    contradiction. Returns whether the board was solved
+    '''
+    if not basic_checks(board): return False
+    if board.solved(): return True
+    i = board.most_constrained()
+    save(board,depth)
+    left = int(board.cand[i])
+    while left:
+        bit = left & -left # the smallest possibility left to try
+        left ^= bit
+        if eliminate(board.cand, board.counts, board.queue, board.queue_len, i, int(board.cand[i]) ^ bit) and search(board,depth+1):
+            return True
+        restore(board,depth)
+    return False
+
+
+def solve(board):
+    '''
+    search for the solution and print
+    the board, or say if there isn't one
+    '''
+    if search(board):
+        print("Solved!")
+    else:
+        print("No solution")
+    print(board)
+
+def solve_all(texts):
+    '''
+    run the batch checks on every board at once,
+    then finish each board off with the search.
+    Anything that isn't 81 digits is reported and skipped
+    '''
+    for t in texts:
+        if not is_board(t):
+            print(f"{t} isn't a board (it needs to be exactly 81 digits)")
+    texts = [t for t in texts if is_board(t)]
+    cand = read_boards(texts)
+    start = cand.copy()
+    possible = batch_checks(cand)
+    for n in range(len(texts)):
+        board = Board()
+        board.load(start[n])
+        print(board) # display the initial board setup
+        board = Board()
+        board.load(cand[n])
+        if possible[n]:
+            solve(board)
         else:
-            simple_brute_check(board)
-        print(board)
-        if prev == str(board.cells): break
+            print("No solution")
+            print(board)
 
-solve()
+texts = input('boards: ').split() # let user input strings of numbers (separated by spaces) to make the boards
+solve_all(texts)